@@ -7,21 +7,47 @@ Refactored version with:
 - Clear error handling and shutdown path
 """
 
+import errno
+import os
+import selectors
 import socket
 import sys
 
 HOST = "127.0.0.1"   # Server address (localhost)
 PORT = 5000          # Must match the server port
-BUFFER_SIZE = 1024
+BUFFER_SIZE = 1 << 16        # Max bytes read per recv() call
+SOCKET_BUFFER_SIZE = 1 << 20  # Kernel send/receive buffer (SO_SNDBUF/SO_RCVBUF)
 ENCODING = "utf-8"
 CONNECT_TIMEOUT = 5.0
+KEEPALIVE_IDLE = 30      # Seconds of idle before the first keepalive probe
+KEEPALIVE_INTERVAL = 10  # Seconds between keepalive probes
+KEEPALIVE_COUNT = 3      # Unanswered probes before the peer is considered dead
+
+
+def enable_keepalive(sock: socket.socket) -> None:
+    """
+    Turn on TCP keepalive so a dead server is detected instead of hanging.
+    Interval tuning is applied only where the platform exposes the options.
+    """
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+    for option, value in (("TCP_KEEPIDLE", KEEPALIVE_IDLE),
+                          ("TCP_KEEPINTVL", KEEPALIVE_INTERVAL),
+                          ("TCP_KEEPCNT", KEEPALIVE_COUNT)):
+        if hasattr(socket, option):
+            sock.setsockopt(socket.IPPROTO_TCP, getattr(socket, option), value)
 
 
 def create_client_socket() -> socket.socket:
     """
-    Create and return a TCP client socket with timeout configured.
+    Create and return a TCP client socket with TCP options, buffer sizes and timeout configured.
     """
     sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    # Disable Nagle's algorithm so short messages are sent immediately
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    enable_keepalive(sock)
+    # Set before connect() so the TCP window scale is negotiated for the larger buffer
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCKET_BUFFER_SIZE)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SOCKET_BUFFER_SIZE)
     sock.settimeout(CONNECT_TIMEOUT)
     return sock
 
@@ -29,19 +55,35 @@ def create_client_socket() -> socket.socket:
 def connect_to_server(sock: socket.socket, host: str, port: int) -> bool:
     """
     Attempt to connect the client socket to the server.
+    Uses a non-blocking connect and waits on a selector, so it returns as soon as
+    the handshake completes or fails (or CONNECT_TIMEOUT passes).
     Returns True on success, False on failure.
     """
+    timeout = sock.gettimeout()
+    sock.setblocking(False)
     try:
-        sock.connect((host, port))
-    except ConnectionRefusedError:
+        err = sock.connect_ex((host, port))
+        if err in (errno.EINPROGRESS, errno.EWOULDBLOCK):
+            # Socket becomes writable once the handshake has finished either way
+            with selectors.DefaultSelector() as sel:
+                sel.register(sock, selectors.EVENT_WRITE)
+                if not sel.select(timeout=CONNECT_TIMEOUT):
+                    print(f"[!] Connection attempt to {host}:{port} timed out.")
+                    return False
+            err = sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+    except OSError as exc:
+        print(f"[!] OS error while connecting: {exc}")
+        return False
+    finally:
+        # Restore the blocking mode and timeout used for the rest of the session
+        sock.settimeout(timeout)
+
+    if err == errno.ECONNREFUSED:
         print(f"[!] Could not connect to server at {host}:{port} (connection refused). "
               f"Is the server running?")
         return False
-    except socket.timeout:
-        print(f"[!] Connection attempt to {host}:{port} timed out.")
-        return False
-    except OSError as exc:
-        print(f"[!] OS error while connecting: {exc}")
+    if err:
+        print(f"[!] OS error while connecting: {os.strerror(err)}")
         return False
 
     print(f"[+] Connected to server at {host}:{port}")
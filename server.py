@@ -3,21 +3,43 @@
 Simple TCP server for CYB333 socket assignment.
 
 - Listens on localhost:5000
-- Accepts a single client connection
+- Serves many client connections concurrently on an asyncio event loop
 - Receives messages and sends responses
 - Handles errors and shuts down cleanly
 """
 
+import asyncio
+import os
+import queue
+import selectors
+import signal
 import socket
 import sys
+import threading
 import time
-from datetime import datetime
+import traceback
+from collections.abc import Callable, Sequence
 
 HOST = "127.0.0.1"   # Loopback address (localhost)
 PORT = 5000          # Arbitrary non-privileged port
-BUFFER_SIZE = 1024   # How many bytes to read at a time
+BUFFER_SIZE = 1 << 16  # Bytes read per call; also the longest accepted message line
 ENCODING = "utf-8"   # String encoding
+SOCKET_BUFFER_SIZE = 1 << 20  # Kernel send/receive buffer per connection (SO_SNDBUF/SO_RCVBUF)
+MAX_CLIENTS = 64     # Clients served at once per process; extra connections wait for a slot
+WORKERS = 1          # Server processes sharing PORT via SO_REUSEPORT (Linux only); try os.cpu_count()
 SERVER_START_TIME = time.time()  # Track server start time for uptime
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"  # Format for the "time" command
+KEEPALIVE_IDLE = 30      # Seconds of idle before the first keepalive probe
+KEEPALIVE_INTERVAL = 10  # Seconds between keepalive probes
+KEEPALIVE_COUNT = 3      # Unanswered probes before the peer is considered dead
+VERBOSE = True           # Log every connection and message; False keeps only warnings and server status
+LOG_BATCH_SIZE = 256     # Most queued log lines written to stdout at once
+
+# Log lines waiting for the log-writer thread; None tells it to stop
+LOG_QUEUE: queue.SimpleQueue[str | None] = queue.SimpleQueue()
+
+# Bounds how many handle_client tasks are active at the same time
+CLIENT_SLOTS = asyncio.Semaphore(MAX_CLIENTS)
 
 # Command descriptions - single source of truth
 COMMANDS = [
@@ -29,146 +51,462 @@ COMMANDS = [
 ]
 
 
-def get_commands_text(prefix: str = "") -> str:
-    """Generate formatted command list with given prefix."""
-    lines = [prefix] if prefix else []
-    for cmd, desc in COMMANDS:
-        lines.append(f"{cmd:<10}: {desc}")
-    return "\n".join(lines)
+def log(message: str) -> None:
+    """
+    Queue a log line for the log-writer thread.
+    Keeps terminal writes (and their flushes) off the event loop.
+    """
+    LOG_QUEUE.put_nowait(message)
 
 
-def receive_message(conn: socket.socket) -> str | None:
+def log_writer() -> None:
     """
-    Receive and decode a message from client.
-    Returns decoded message or None if connection closed.
+    Write queued log lines to stdout in batches until a None sentinel arrives.
     """
-    try:
-        data = conn.recv(BUFFER_SIZE)
-    except ConnectionResetError:
-        print("[!] Connection reset by client.")
-        return None
+    while True:
+        batch = [LOG_QUEUE.get()]
+        while len(batch) < LOG_BATCH_SIZE and not LOG_QUEUE.empty():
+            batch.append(LOG_QUEUE.get_nowait())
+
+        stop = None in batch
+        if stop:
+            batch = batch[:batch.index(None)]
+        if batch:
+            sys.stdout.write("\n".join(batch) + "\n")
+            sys.stdout.flush()
+        if stop:
+            return
+
+
+# Command list as sent to clients; COMMANDS never changes, so format it once
+COMMANDS_TEXT = "\n".join(f"{cmd:<10}: {desc}" for cmd, desc in COMMANDS)
+
+# Fixed replies, encoded once at import instead of on every request
+GOODBYE_BYTES = "Goodbye from server.\n".encode(ENCODING)
+HELP_BYTES = f"\n--- Available Commands ---\n{COMMANDS_TEXT}\n".encode(ENCODING)
+ECHO_TEMPLATE = b'Server received "%b"\n'  # Filled with the message bytes via bytes %-formatting
+WELCOME_BYTES = (
+    "\nWelcome to the server!\n----------------------\n"
+    f"Available commands\n{COMMANDS_TEXT}\n----------------------\n"
+).encode(ENCODING)
+
+
+def configure_connection(sock: socket.socket) -> None:
+    """
+    Apply per-connection TCP options to an accepted client socket.
+    """
+    # asyncio already disables Nagle's algorithm on accepted TCP sockets;
+    # set it here too so the option the protocol relies on is explicit
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    enable_keepalive(sock)
+
+
+def set_buffer_sizes(sock: socket.socket) -> None:
+    """
+    Enlarge the kernel send/receive buffers so bulk traffic needs fewer syscalls.
+    """
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCKET_BUFFER_SIZE)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SOCKET_BUFFER_SIZE)
+
+
+def enable_keepalive(sock: socket.socket) -> None:
+    """
+    Turn on TCP keepalive so the kernel detects silently dead clients.
+    Interval tuning is applied only where the platform exposes the options.
+    """
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+    for option, value in (("TCP_KEEPIDLE", KEEPALIVE_IDLE),
+                          ("TCP_KEEPINTVL", KEEPALIVE_INTERVAL),
+                          ("TCP_KEEPCNT", KEEPALIVE_COUNT)):
+        if hasattr(socket, option):
+            sock.setsockopt(socket.IPPROTO_TCP, getattr(socket, option), value)
+
+
+async def receive_lines(reader: asyncio.StreamReader, buffer: bytearray) -> list[bytes] | None:
+    """
+    Read from client until buffer holds at least one newline-terminated message.
+    Returns every complete message (surrounding whitespace removed) and leaves any
+    partial message in buffer, or returns None if connection closed.
+    """
+    while (end := buffer.rfind(b"\n")) == -1:
+        if len(buffer) > BUFFER_SIZE:
+            break
 
-    if not data:
-        print("[*] Client closed the connection.")
+        try:
+            data = await reader.read(BUFFER_SIZE)
+        except ConnectionResetError:
+            log("[!] Connection reset by client.")
+            return None
+        except TimeoutError:
+            # Raised when keepalive probes go unanswered
+            log("[!] Client stopped responding (keepalive timeout).")
+            return None
+
+        if not data:
+            if buffer:
+                # Final message sent without a newline before closing
+                messages = [bytes(buffer).strip()]
+                buffer.clear()
+                return messages
+            if VERBOSE:
+                log("[*] Client closed the connection.")
+            return None
+
+        buffer += data
+
+    # Only the first message can span several reads, so it is the only one to check
+    if end == -1 or buffer.find(b"\n") > BUFFER_SIZE:
+        log(f"[!] Client message exceeded {BUFFER_SIZE} bytes. Closing connection.")
         return None
 
-    return data.decode(ENCODING).strip()
+    messages = [line.strip() for line in bytes(buffer[:end]).split(b"\n")]
+    del buffer[:end + 1]
+    return messages
 
 
-def send_response(conn: socket.socket, response: str) -> bool:
+async def send_response(writer: asyncio.StreamWriter, replies: Sequence[bytes]) -> bool:
     """
-    Send response to client.
+    Send pre-encoded replies to client as one gathered write.
     Returns True on success, False on failure.
     """
     try:
-        conn.sendall((response + "\n").encode(ENCODING))
-        print(f"[>] [Sent to client] {response}")
+        # writelines() hands every reply to the transport at once
+        # (a single sendmsg() call on Python 3.12+) instead of joining them first
+        writer.writelines(replies)
+        # Small replies usually go straight to the kernel; only wait
+        # when the transport had to buffer, or to surface a failed connection
+        if writer.transport.get_write_buffer_size() or writer.is_closing():
+            await writer.drain()
+        if VERBOSE:
+            sent = b"".join(replies).decode(ENCODING, errors="replace").rstrip()
+            log(f"[>] [Sent to client] {sent}")
         return True
-    except BrokenPipeError:
-        print("[!] Failed to send data. Client may have disconnected.")
+    except OSError:
+        # Broken pipe, reset, or keepalive timeout (re-raised by drain())
+        log("[!] Failed to send data. Client may have disconnected.")
         return False
 
 
-def handle_message(conn: socket.socket, message: str) -> bool:
+def reply_exit() -> bytes:
+    """Reply to "exit"."""
+    return GOODBYE_BYTES
+
+
+def reply_help() -> bytes:
+    """Reply to "help" with the command list."""
+    return HELP_BYTES
+
+
+# Last "time" reply as (epoch second, encoded reply); reused within the same second
+TIME_CACHE: tuple[int, bytes] = (0, b"")
+
+
+def reply_time() -> bytes:
+    """Reply to "time", formatting the timestamp at most once per second."""
+    global TIME_CACHE
+    now = int(time.time())
+    if now != TIME_CACHE[0]:
+        current_time = time.strftime(TIME_FORMAT, time.localtime(now))
+        TIME_CACHE = (now, f"[Current server time] {current_time}\n".encode(ENCODING))
+    return TIME_CACHE[1]
+
+
+def reply_uptime() -> bytes:
+    """Reply to "uptime" with how long the server has been running."""
+    uptime_seconds = int(time.time() - SERVER_START_TIME)
+    hours, remainder = divmod(uptime_seconds, 3600)
+    minutes, seconds = divmod(remainder, 60)
+    return f"[Server uptime] {hours}h {minutes}m {seconds}s\n".encode(ENCODING)
+
+
+# Lowercased command bytes -> function building the reply
+COMMAND_TABLE: dict[bytes, Callable[[], bytes]] = {
+    b"exit": reply_exit,
+    b"help": reply_help,
+    b"time": reply_time,
+    b"uptime": reply_uptime,
+}
+
+
+def dispatch(message: bytes) -> tuple[bytes, bool]:
+    """
+    Map one client message to its reply, without doing any I/O.
+    Returns (reply bytes, keep_open); keep_open is False once the client asked to exit.
+    """
+    # Commands are ASCII, so the cheap bytes.lower() is enough for the lookup
+    key = message.lower()
+    reply = COMMAND_TABLE.get(key)
+    if reply is None:
+        return ECHO_TEMPLATE % message, True
+
+    return reply(), key != b"exit"
+
+
+async def handle_messages(writer: asyncio.StreamWriter, messages: list[bytes]) -> bool:
     """
-    Process client message and send appropriate response.
+    Process client messages that arrived together and send all responses in one write.
+    Messages after an "exit" are ignored.
     Returns False if client requested exit or connection failed, True to continue.
     """
-    print(f"[<] [Received from client] {message}")
+    replies = []
+    keep_open = True
+    for message in messages:
+        if VERBOSE:
+            log(f"[<] [Received from client] {message.decode(ENCODING, errors='replace')}")
+
+        reply, keep_open = dispatch(message)
+        replies.append(reply)
+        if not keep_open:
+            break
 
-    if message.lower() == "exit":
-        goodbye = "Goodbye from server."
-        send_response(conn, goodbye)
-        print("[*] Client requested to close the connection. Shutting down.")
+    if not await send_response(writer, replies):
         return False
 
-    if message.lower() == "help":
-        help_text = get_commands_text("\n--- Available Commands ---")
-        if not send_response(conn, help_text):
-            return False
-        return True
+    if not keep_open:
+        if VERBOSE:
+            log("[*] Client requested to close the connection.")
+    return keep_open
 
-    if message.lower() == "time":
-        current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        response = f"[Current server time] {current_time}"
-        if not send_response(conn, response):
-            return False
-        return True
 
-    if message.lower() == "uptime":
-        uptime_seconds = int(time.time() - SERVER_START_TIME)
-        hours, remainder = divmod(uptime_seconds, 3600)
-        minutes, seconds = divmod(remainder, 60)
-        response = f"[Server uptime] {hours}h {minutes}m {seconds}s"
-        if not send_response(conn, response):
-            return False
-        return True
+async def handle_client(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    """
+    Entry point for each accepted connection.
+    Runs as its own task on the event loop; at most MAX_CLIENTS are served at once.
+    """
+    ip, port = writer.get_extra_info("peername")[:2]
+    if VERBOSE:
+        log(f"[+] Connection established with {ip}:{port}")
+    configure_connection(writer.get_extra_info("socket"))
 
-    response = f"Server received \"{message}\""
-    if not send_response(conn, response):
-        return False
+    if CLIENT_SLOTS.locked():
+        log(f"[*] {MAX_CLIENTS} clients connected; {ip}:{port} waiting for a free slot.")
 
-    return True
+    try:
+        async with CLIENT_SLOTS:
+            await serve_client(reader, writer)
+    except asyncio.CancelledError:
+        # Server is shutting down; end the task quietly
+        pass
+    finally:
+        # Close the connection whichever way it ended, including while
+        # still waiting for a slot
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except OSError:
+            # The error that ended the connection (reset, keepalive timeout, ...)
+            # was already reported; wait_closed() just re-raises it
+            pass
+        if VERBOSE:
+            log(f"[-] Connection with {ip}:{port} closed.")
 
 
-def handle_client(conn: socket.socket, addr: tuple) -> None:
+async def serve_client(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
     """
-    Main loop for handling a connected client.
+    Run the message loop for a client that holds a slot.
     """
-    ip, port = addr
-    print(f"[+] Connection established with {ip}:{port}")
+    if not await query_list(writer):
+        return
 
+    # Bytes received but not yet split into complete messages
+    buffer = bytearray()
     while True:
-        message = receive_message(conn)
-        if message is None:
+        messages = await receive_lines(reader, buffer)
+        if messages is None:
             break
 
-        if not handle_message(conn, message):
+        if not await handle_messages(writer, messages):
             break
 
 
-def start_server() -> None:
-    """Create, bind, and run the TCP server."""
-    # Create a TCP/IP socket (AF_INET = IPv4, SOCK_STREAM = TCP)
-    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as server_sock:
-        # Allow reusing the address quickly after restart
-        server_sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+async def start_server(reuse_port: bool = False) -> None:
+    """
+    Create, bind, and run the TCP server.
+    With reuse_port, several processes can each bind their own listener to HOST:PORT.
+    """
+    name = f"Worker {os.getpid()}" if reuse_port else "Server"
 
-        try:
-            server_sock.bind((HOST, PORT))
-        except OSError as exc:
-            print(f"[!] Failed to bind to {HOST}:{PORT}: {exc}")
-            sys.exit(1)
+    # asyncio creates the listening socket (SO_REUSEADDR is set by default on POSIX)
+    try:
+        server = await asyncio.start_server(handle_client, HOST, PORT, limit=BUFFER_SIZE,
+                                            reuse_port=reuse_port or None)
+    except OSError as exc:
+        log(f"[!] Failed to bind to {HOST}:{PORT}: {exc}")
+        sys.exit(1)
+
+    # Accepted connections inherit the listener's buffer sizes (and window scale)
+    for sock in server.sockets:
+        set_buffer_sizes(sock)
+
+    log(f"[+] {name} listening on {HOST}:{PORT} ...")
+
+    # A loop signal handler wakes select() even if Ctrl+C lands just before it
+    # blocks; a second Ctrl+C falls back to KeyboardInterrupt
+    loop = asyncio.get_running_loop()
+    main_task = asyncio.current_task()
 
-        # Start listening for incoming connections
-        server_sock.listen()
-        print(f"[+] Server listening on {HOST}:{PORT} ...")
+    def stop() -> None:
+        loop.remove_signal_handler(signal.SIGINT)
+        main_task.cancel()
 
+    try:
+        loop.add_signal_handler(signal.SIGINT, stop)
+    except NotImplementedError:
+        pass  # Windows: keep asyncio.Runner's own Ctrl+C handling
+
+    # Serve clients until the event loop is cancelled (e.g. Ctrl+C)
+    async with server:
         try:
-            # Block until a client connects
-            conn, addr = server_sock.accept()
-            query_list(conn)
-        except KeyboardInterrupt:
-            print("\n[!] Server interrupted before accepting a connection. Shutting down.")
-            return
+            await server.serve_forever()
+        except asyncio.CancelledError:
+            pass
+
+    log(f"[*] {name} shut down cleanly.")
 
-        # Use context manager so the connection is closed automatically
-        with conn:
-            handle_client(conn, addr)
+    # Report Ctrl+C to run_server() the way asyncio.Runner does
+    if main_task.cancelling():
+        raise KeyboardInterrupt
 
-        print("[*] Server shut down cleanly.")
 
-def query_list(conn: socket.socket) -> None:
+async def query_list(writer: asyncio.StreamWriter) -> bool:
     """
     Send welcome message and list of available commands to the client.
+    Returns True on success, False on failure.
     """
-    commands_list = get_commands_text("Available commands")
-    welcome_message = f"\nWelcome to the server!\n----------------------\n{commands_list}\n----------------------\n"
-    conn.sendall(welcome_message.encode(ENCODING))
+    try:
+        writer.write(WELCOME_BYTES)
+        await writer.drain()
+        return True
+    except OSError:
+        # Broken pipe, reset, or keepalive timeout while waiting for a slot
+        log("[!] Failed to send welcome message. Client may have disconnected.")
+        return False
 
-if __name__ == "__main__":
+
+def new_event_loop() -> asyncio.AbstractEventLoop:
+    """
+    Create the server's event loop on the platform's best readiness selector
+    (epoll on Linux, kqueue on macOS/BSD).
+    This is the single place to plug in a different I/O backend.
+    """
+    if sys.platform == "win32":
+        # DefaultSelector is select() here, capped at 512 sockets; keep the Proactor loop
+        return asyncio.new_event_loop()
+    return asyncio.SelectorEventLoop(selectors.DefaultSelector())
+
+
+def run_server(reuse_port: bool = False) -> None:
+    """
+    Run one server process (log writer thread plus event loop) until Ctrl+C.
+    """
+    log_thread = threading.Thread(target=log_writer, name="log-writer", daemon=True)
+    log_thread.start()
     try:
-        start_server()
+        with asyncio.Runner(loop_factory=new_event_loop) as runner:
+            runner.run(start_server(reuse_port))
     except KeyboardInterrupt:
         # Catch Ctrl+C while server is running
-        print("\n[!] Server interrupted by user. Exiting...")
+        log("\n[!] Server interrupted by user. Exiting...")
+    finally:
+        # Flush queued log lines before the process exits
+        LOG_QUEUE.put(None)
+        log_thread.join()
+
+
+def run_worker_process() -> int:
+    """
+    Body of a forked worker process.
+    Returns the exit status for os._exit().
+    """
+    try:
+        run_server(reuse_port=True)
+    except SystemExit as exc:
+        return exc.code if isinstance(exc.code, int) else 1
+    except BaseException:
+        traceback.print_exc()
+        return 1
+    return 0
+
+
+def check_port_free() -> None:
+    """
+    Make sure nothing is listening on HOST:PORT before forking workers.
+    SO_REUSEPORT listeners would otherwise bind next to another server (such as a
+    second copy of this one) and silently share its clients. Exits if the port is taken.
+    """
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as probe:
+        # Like asyncio's listeners: TIME_WAIT leftovers are fine, a live listener is not
+        probe.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        try:
+            probe.bind((HOST, PORT))
+        except OSError as exc:
+            print(f"[!] Failed to bind to {HOST}:{PORT}: {exc}")
+            sys.exit(1)
+
+
+def run_server_processes(count: int) -> None:
+    """
+    Fork count worker processes, each with its own SO_REUSEPORT listener on HOST:PORT,
+    so the kernel spreads new connections across them. Waits for all workers to exit.
+    """
+    check_port_free()
+
+    workers: set[int] = set()
+    stopping = False
+
+    def stop_workers(signum: int, frame: object) -> None:
+        """Forward Ctrl+C, SIGTERM or SIGHUP to every worker once, so they shut down cleanly."""
+        nonlocal stopping
+        if stopping:
+            return
+        stopping = True
+        reason = "interrupted by user" if signum == signal.SIGINT else f"received {signal.Signals(signum).name}"
+        print(f"\n[!] Server {reason}. Stopping workers...", flush=True)
+        for pid in workers:
+            try:
+                os.kill(pid, signal.SIGINT)
+            except ProcessLookupError:
+                pass
+
+    stop_signals = {signal.SIGINT, signal.SIGTERM, signal.SIGHUP}
+    for signum in stop_signals:
+        signal.signal(signum, stop_workers)
+
+    # Hold stop signals while forking so every worker is in `workers` before one is forwarded
+    blocked = signal.pthread_sigmask(signal.SIG_BLOCK, stop_signals)
+    for _ in range(count):
+        pid = os.fork()
+        if pid == 0:
+            # Workers stop on the SIGINT forwarded by the parent, not on the parent's handler
+            signal.signal(signal.SIGINT, signal.default_int_handler)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGHUP, signal.SIG_DFL)
+            signal.pthread_sigmask(signal.SIG_SETMASK, blocked)
+            # Own process group: Ctrl+C reaches only this parent, which forwards it once
+            os.setpgid(0, 0)
+            os._exit(run_worker_process())
+        workers.add(pid)
+    signal.pthread_sigmask(signal.SIG_SETMASK, blocked)
+
+    print(f"[+] Started {count} server processes on {HOST}:{PORT} ...", flush=True)
+
+    failed = False
+    while workers:
+        pid, status = os.wait()
+        workers.discard(pid)
+        if os.waitstatus_to_exitcode(status) != 0:
+            failed = True
+
+    if failed:
+        print("[!] One or more server processes exited with an error.")
+        sys.exit(1)
+
+    print("[*] Server shut down cleanly.")
+
+
+if __name__ == "__main__":
+    # SO_REUSEPORT only load-balances connections across listeners on Linux
+    if WORKERS > 1 and sys.platform == "linux":
+        run_server_processes(WORKERS)
+    else:
+        run_server()